@@ -1,15 +1,17 @@
 from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
-from notion_client import Client
+from notion_tenants import load_tenant_registry
+from notion_snapshot import write_snapshot, load_snapshot
 from datetime import datetime, timedelta
 import streamlit as st
+import pyarrow as pa
+import pyarrow.compute as pc
 import os
 import json
 import re
 
 # Load API keys
 load_dotenv()
-notion = Client(auth=os.getenv("NOTION_API_KEY"))
 openai_api_key = os.getenv("OPENAI_API_KEY")
 langchain_api_key = os.getenv("LANGCHAIN_API_KEY")
 os.environ["LANGCHAIN_PROJECT"] = "NotionAgentProject"
@@ -18,8 +20,40 @@ os.environ["LANGCHAIN_TRACING_V2"] = "true"
 # Initialize LLM
 llm = ChatOpenAI(model="gpt-4.1-mini-2025-04-14")
 
-# Set database ID
-DATABASE_ID = "YOUR NOTION DATABASE ID"
+# Database ID used when no tenants file is configured
+DEFAULT_DATABASE_ID = "YOUR NOTION DATABASE ID"
+
+# Tenant registry shared by every session of this server
+@st.cache_resource
+def get_tenant_registry():
+    return load_tenant_registry(
+        os.getenv("NOTION_TENANTS_FILE", "tenants.json"),
+        default_database_id=DEFAULT_DATABASE_ID,
+        default_token=os.getenv("NOTION_API_KEY")
+    )
+
+# Use a tenant the logged-in user belongs to, never a client-supplied id
+registry = get_tenant_registry()
+user = None
+if registry.requires_login:
+    if not st.user.is_logged_in:
+        st.button("Log in", on_click=st.login)
+        st.stop()
+    user = st.user.email
+tenants = registry.tenants_for_user(user)
+if not tenants:
+    st.error("❌ Error: No Notion database is configured for your account.")
+    st.stop()
+tenant_id = tenants[0].tenant_id
+if len(tenants) > 1:
+    tenant_id = st.sidebar.selectbox("Notion database", [t.tenant_id for t in tenants])
+tenant = registry.authorize(user, tenant_id)
+notion = tenant.client()
+notion_bulk = tenant.client("bulk")
+DATABASE_ID = tenant.database_id
+
+# Local columnar snapshots of the database, partitioned by application month
+SNAPSHOT_DIR = os.path.join("snapshots", tenant.tenant_id)
 
 # Get the date information
 today = datetime.now().date()
@@ -181,7 +215,8 @@ def get_filter_from_llm(nl_prompt: str) -> dict:
         raise ValueError(f"Failed to parse LLM response as JSON. Raw output:\n{response}\n\nError: {e}")
 
 # Function to query Notion database with a filter
-def query_notion_database(payload: dict) -> list:
+def query_notion_database(payload: dict, include_metadata: bool = False, bulk: bool = False) -> list:
+    client = notion_bulk if bulk else notion
     all_results = []
     has_more = True
     next_cursor = None
@@ -190,7 +225,7 @@ def query_notion_database(payload: dict) -> list:
         if next_cursor:
             payload["start_cursor"] = next_cursor
 
-        response = notion.databases.query(database_id=DATABASE_ID, **payload)
+        response = client.databases.query(database_id=DATABASE_ID, **payload)
         all_results.extend(response["results"])
         has_more = response.get("has_more", False)
         next_cursor = response.get("next_cursor")
@@ -200,6 +235,9 @@ def query_notion_database(payload: dict) -> list:
     for item in all_results:
         props = item["properties"]
         record = {}
+        if include_metadata:
+            record["id"] = item["id"]
+            record["last_edited_time"] = item["last_edited_time"]
         for name, prop_data in props.items():
             prop_type = prop_data.get("type")
             value = None
@@ -274,17 +312,62 @@ def get_intent_and_payload(nl_prompt: str) -> dict:
     return json.loads(response)
 
 # Function to analyze job application records
-def analyze_records(records: list, nl_prompt: str) -> str:
-    statuses = [r.get("Status", "") for r in records]
-    total = len(statuses)
-    rejected = sum(1 for s in statuses if s.lower() == "rejected")
+def analyze_records(records, nl_prompt: str) -> str:
+    # Snapshot tables are counted in Arrow without materializing Python rows
+    if isinstance(records, pa.Table):
+        total = records.num_rows
+        statuses = pc.utf8_lower(pc.fill_null(records.column("Status"), ""))
+        rejected = pc.sum(pc.equal(statuses, "rejected")).as_py() or 0
+    else:
+        statuses = [r.get("Status", "") for r in records]
+        total = len(statuses)
+        rejected = sum(1 for s in statuses if s.lower() == "rejected")
     if total == 0:
         return "No job applications found."
     rate = rejected / total * 100
     return f"You applied to {total} jobs. {rejected} were rejected. Rejection rate: {rate:.1f}%."
 
+# Function to write new, changed and deleted Notion pages to the local snapshot
+def snapshot_notion_database(full: bool = False) -> int:
+    fetch = lambda payload: query_notion_database(payload, include_metadata=True, bulk=True)
+    return write_snapshot(SNAPSHOT_DIR, fetch, full)
+
+# Function to summarize the snapshot year over year without calling the Notion API
+def analyze_snapshot_by_year(start_month: str = None, end_month: str = None) -> list:
+    table = load_snapshot(SNAPSHOT_DIR, ["Status", "Date of application"], start_month, end_month)
+    if "Date of application" not in table.column_names or "Status" not in table.column_names:
+        return []
+
+    years = pc.utf8_slice_codeunits(pc.fill_null(table.column("Date of application"), ""), 0, 4)
+    report = []
+    for year in sorted(pc.unique(years).to_pylist()):
+        if not year:
+            continue
+        year_table = table.filter(pc.equal(years, year))
+        report.append({"Year": year, "Summary": analyze_records(year_table, "")})
+    return report
+
 # Streamlit UI
 st.title("Notion AI Agent")
+
+with st.sidebar:
+    st.header("Snapshot")
+    if st.button("Update snapshot"):
+        try:
+            st.success(f"✅ Saved {snapshot_notion_database()} new, changed or deleted entries to the snapshot.")
+        except Exception as e:
+            st.error(f"❌ Error: {e}")
+    if st.button("Full resync"):
+        try:
+            st.success(f"✅ Saved {snapshot_notion_database(full=True)} new, changed or deleted entries to the snapshot.")
+        except Exception as e:
+            st.error(f"❌ Error: {e}")
+    if st.button("Year-over-year report"):
+        try:
+            st.dataframe(analyze_snapshot_by_year())
+        except Exception as e:
+            st.error(f"❌ Error: {e}")
+
 nl_prompt = st.text_input("Ask a question:")
 
 if st.button("Run") and nl_prompt:
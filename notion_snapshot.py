@@ -0,0 +1,166 @@
+from datetime import datetime, timedelta, timezone
+import pyarrow as pa
+import pyarrow.compute as pc
+import hashlib
+import json
+import os
+
+# A full fetch reconciles deleted and archived pages, which incremental queries never return
+SNAPSHOT_RECONCILE_DAYS = 7
+
+# Columns needed to pick the latest version of each page
+KEY_COLUMNS = ("id", "last_edited_time", "_hash")
+
+
+# Function to fingerprint a decoded record so unchanged pages are not written twice
+def _record_hash(record: dict) -> str:
+    return hashlib.sha1(json.dumps(record, sort_keys=True).encode()).hexdigest()
+
+
+# Function to list snapshot part files as (month, path) in the order they were written
+def _part_files(snapshot_dir: str) -> list:
+    parts = []
+    if os.path.isdir(snapshot_dir):
+        for month_dir in sorted(os.listdir(snapshot_dir)):
+            if not month_dir.startswith("application_month="):
+                continue
+            month = month_dir.split("=", 1)[1]
+            for name in sorted(os.listdir(os.path.join(snapshot_dir, month_dir))):
+                parts.append((month, os.path.join(snapshot_dir, month_dir, name)))
+    return parts
+
+
+def _open_part(path: str) -> pa.Table:
+    return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+
+# Function to read only the key columns of every part file, tagged with where each row lives;
+# the files are memory-mapped, so the other columns are never paged in
+def _read_keys(snapshot_dir: str) -> pa.Table:
+    tables = []
+    for month, path in _part_files(snapshot_dir):
+        table = _open_part(path)
+        table = table.select([c for c in KEY_COLUMNS if c in table.column_names])
+        # "part-<stamp>.arrow" stamps sort in the order the snapshots were taken
+        table = table.append_column("_seq", pa.array([os.path.basename(path)] * table.num_rows, pa.string()))
+        table = table.append_column("application_month", pa.array([month] * table.num_rows, pa.string()))
+        table = table.append_column("_file", pa.array([path] * table.num_rows, pa.string()))
+        table = table.append_column("_index", pa.array(range(table.num_rows), pa.int64()))
+        tables.append(table)
+
+    if not tables:
+        return pa.table({name: pa.array([], pa.string()) for name in ("id", "last_edited_time", "_seq", "application_month", "_file")}
+                        | {"_index": pa.array([], pa.int64())})
+    return pa.concat_tables(tables, promote_options="default")
+
+
+# Function to keep only the latest version of each page across all partitions
+def _latest_versions(keys: pa.Table) -> pa.Table:
+    # Every part file is a later fetch of Notion's current state, so the newest
+    # file wins; the minute-rounded edit time only breaks ties within a file
+    keys = keys.sort_by([("_seq", "descending"), ("last_edited_time", "descending")])
+    keys = keys.append_column("_row", pa.array(range(keys.num_rows), pa.int64()))
+    latest = keys.group_by("id", use_threads=False).aggregate([("_row", "min")]).column("_row_min")
+    return keys.take(pc.take(latest, pc.sort_indices(latest))).drop_columns(["_row"])
+
+
+# Function to write rows as one part file per application month, e.g. "2025-06"
+def _write_parts(snapshot_dir: str, rows: list, stamp: str):
+    partitions = {}
+    for row in rows:
+        month = row.get("Date of application", "")[:7] or "unknown"
+        partitions.setdefault(month, []).append(row)
+
+    columns = sorted({name for row in rows for name in row})
+    schema = pa.schema([(name, pa.string()) for name in columns])
+    for month, month_rows in partitions.items():
+        month_dir = os.path.join(snapshot_dir, f"application_month={month}")
+        os.makedirs(month_dir, exist_ok=True)
+        table = pa.Table.from_pylist(month_rows, schema=schema)
+        with pa.OSFile(os.path.join(month_dir, f"part-{stamp}.arrow"), "wb") as sink:
+            with pa.ipc.new_file(sink, schema) as writer:
+                writer.write_table(table)
+
+
+# Function to write new, changed and deleted Notion pages to the snapshot
+def write_snapshot(snapshot_dir: str, fetch, full: bool = False) -> int:
+    state_file = os.path.join(snapshot_dir, "_state.json")
+    state = {}
+    if os.path.exists(state_file):
+        with open(state_file) as f:
+            state = json.load(f)
+
+    now = datetime.now(timezone.utc)
+    last_full_sync = state.get("last_full_sync")
+    if not last_full_sync or now - datetime.fromisoformat(last_full_sync) > timedelta(days=SNAPSHOT_RECONCILE_DAYS):
+        full = True
+
+    # Incremental runs only fetch pages edited since the last snapshot
+    payload = {}
+    if not full and state.get("last_edited_time"):
+        payload["filter"] = {
+            "timestamp": "last_edited_time",
+            "last_edited_time": {"on_or_after": state["last_edited_time"]}
+        }
+    records = fetch(payload)
+
+    stored = _latest_versions(_read_keys(snapshot_dir))
+    stored_hashes = dict(zip(stored.column("id").to_pylist(), stored.column("_hash").to_pylist())) if "_hash" in stored.column_names else {}
+    rows = [{**record, "_hash": _record_hash(record)} for record in records]
+
+    # The boundary minute is fetched again on every run; only pages whose content changed count
+    changed = [row for row in rows if stored_hashes.get(row["id"]) != row["_hash"]]
+    stamp = now.strftime("%Y%m%dT%H%M%S%f")
+
+    if full:
+        # A full fetch is Notion's whole current state: rewrite it as one file per
+        # month and drop the older parts, which also removes deleted pages
+        old_parts = _part_files(snapshot_dir)
+        deleted = set(stored_hashes) - {row["id"] for row in rows}
+        if changed or deleted or len(old_parts) > len({month for month, _ in old_parts}):
+            _write_parts(snapshot_dir, rows, stamp)
+            for month, path in old_parts:
+                os.remove(path)
+                if not os.listdir(os.path.dirname(path)):
+                    os.rmdir(os.path.dirname(path))
+        count = len(changed) + len(deleted)
+    else:
+        if changed:
+            _write_parts(snapshot_dir, changed, stamp)
+        count = len(changed)
+
+    if records:
+        state["last_edited_time"] = max([r["last_edited_time"] for r in records] + [state.get("last_edited_time", "")])
+    if full:
+        state["last_full_sync"] = now.isoformat()
+    os.makedirs(snapshot_dir, exist_ok=True)
+    with open(state_file, "w") as f:
+        json.dump(state, f)
+    return count
+
+
+# Function to read the snapshot memory-mapped, keeping the latest version of each page
+def load_snapshot(snapshot_dir: str, columns: list = None, start_month: str = None, end_month: str = None) -> pa.Table:
+    # De-duplicate on the key columns across all partitions before filtering by
+    # month, so a page whose application date moved is not read from its old month
+    keys = _latest_versions(_read_keys(snapshot_dir))
+    months = keys.column("application_month")
+    in_range = pc.not_equal(months, "unknown")
+    if start_month:
+        in_range = pc.and_(in_range, pc.greater_equal(months, start_month))
+    if end_month:
+        in_range = pc.and_(in_range, pc.less_equal(months, end_month))
+    keys = keys.filter(pc.or_(pc.equal(months, "unknown"), in_range))
+
+    # Read the requested columns only for the surviving rows of each file
+    tables = []
+    for path in sorted(set(keys.column("_file").to_pylist())):
+        table = _open_part(path)
+        wanted = ["id", "last_edited_time"] + [c for c in (table.column_names if columns is None else columns)
+                                               if c not in KEY_COLUMNS]
+        rows = keys.filter(pc.equal(keys.column("_file"), path)).column("_index")
+        tables.append(table.select([c for c in wanted if c in table.column_names]).take(rows))
+
+    if not tables:
+        return pa.table({"id": pa.array([], pa.string()), "last_edited_time": pa.array([], pa.string())})
+    return pa.concat_tables(tables, promote_options="default")
@@ -0,0 +1,256 @@
+from notion_client import Client, APIResponseError, APIErrorCode
+from concurrent.futures import Future
+from contextlib import contextmanager
+from collections import deque
+import threading
+import queue
+import time
+import json
+import os
+
+# Notion allows an average of three requests per second per integration token;
+# staying slightly under it with a burst of one keeps every one-second window
+# within the limit even when network jitter bunches requests together
+NOTION_REQUESTS_PER_SECOND = 2.8
+NOTION_BURST = 1
+RATE_LIMIT_RETRIES = 3
+CLIENTS_PER_TENANT = 2
+
+# Interactive requests are served before bulk jobs such as snapshots
+PRIORITIES = ("interactive", "bulk")
+
+
+# --- Rate limiting ---
+class TokenBucket:
+    def __init__(self, rate: float = NOTION_REQUESTS_PER_SECOND, burst: int = NOTION_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    # Take a token if one is available, otherwise return the seconds until one is
+    def try_acquire(self, now: float) -> float:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    # Back off for as long as Notion's Retry-After asked after a 429
+    def pause(self, seconds: float):
+        self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+
+# --- Fair scheduling ---
+class FairScheduler:
+    def __init__(self, workers: int = 8):
+        self._cond = threading.Condition()
+        self._queues = {}     # tenant_id -> {priority: deque of jobs}
+        self._tenants = []    # round-robin order of tenant ids
+        self._cursor = 0
+        self._buckets = {}    # token -> TokenBucket, shared by tenants on the same token
+        self._in_flight = {}  # tenant_id -> requests currently holding a pooled client
+        self._closed = False
+        self._threads = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def add_tenant(self, tenant):
+        with self._cond:
+            if tenant.tenant_id not in self._queues:
+                self._queues[tenant.tenant_id] = {priority: deque() for priority in PRIORITIES}
+                self._tenants.append(tenant.tenant_id)
+                self._in_flight[tenant.tenant_id] = 0
+            self._buckets.setdefault(tenant.token, TokenBucket())
+
+    def submit(self, tenant, fn, priority: str = "interactive") -> Future:
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Scheduler is shut down")
+            self._queues[tenant.tenant_id][priority].append((tenant, fn, future, priority, 0))
+            self._cond.notify()
+        return future
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    # Pick the next tenant in round-robin order with a free pooled client and
+    # token capacity, preferring any tenant's interactive work over bulk work
+    def _next_job(self):
+        with self._cond:
+            while not self._closed:
+                now = time.monotonic()
+                wait = None
+                for priority in PRIORITIES:
+                    for offset in range(len(self._tenants)):
+                        index = (self._cursor + offset) % len(self._tenants)
+                        tenant_id = self._tenants[index]
+                        jobs = self._queues[tenant_id][priority]
+                        if not jobs or self._in_flight[tenant_id] >= jobs[0][0].pool_size:
+                            continue
+                        delay = self._buckets[jobs[0][0].token].try_acquire(now)
+                        if delay == 0:
+                            self._cursor = index + 1
+                            self._in_flight[tenant_id] += 1
+                            return jobs.popleft()
+                        wait = delay if wait is None else min(wait, delay)
+                self._cond.wait(timeout=wait)
+            return None
+
+    def _work(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            tenant, fn, future, priority, attempts = job
+            if attempts == 0 and not future.set_running_or_notify_cancel():
+                with self._cond:
+                    self._in_flight[tenant.tenant_id] -= 1
+                continue
+            try:
+                with tenant.pooled_client() as client:
+                    result = fn(client)
+            except APIResponseError as e:
+                if e.code == APIErrorCode.RateLimited and attempts < RATE_LIMIT_RETRIES:
+                    # Requeue at the front so the request keeps its place in line
+                    with self._cond:
+                        self._buckets[tenant.token].pause(_retry_after(e))
+                        self._queues[tenant.tenant_id][priority].appendleft((tenant, fn, future, priority, attempts + 1))
+                        self._cond.notify()
+                else:
+                    future.set_exception(e)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            finally:
+                with self._cond:
+                    self._in_flight[tenant.tenant_id] -= 1
+                    self._cond.notify_all()
+
+
+# Function to read how long Notion asked us to wait after a 429
+def _retry_after(error: APIResponseError) -> float:
+    try:
+        return max(float(error.headers.get("Retry-After", 1.0)), 0.0)
+    except ValueError:
+        return 1.0
+
+
+# --- Tenants ---
+class Tenant:
+    def __init__(self, tenant_id: str, database_id: str, token: str, scheduler: FairScheduler,
+                 client_factory=None, pool_size: int = CLIENTS_PER_TENANT, users: set = None):
+        self.tenant_id = tenant_id
+        self.database_id = database_id
+        self.token = token
+        self.users = users    # authenticated users allowed in; None only for the single-user default
+        self.scheduler = scheduler
+        self.pool_size = pool_size
+        self._pool = queue.Queue()
+        for _ in range(pool_size):
+            self._pool.put((client_factory or (lambda token: Client(auth=token)))(token))
+        scheduler.add_tenant(self)
+
+    @contextmanager
+    def pooled_client(self):
+        client = self._pool.get()
+        try:
+            yield client
+        finally:
+            self._pool.put(client)
+
+    def allows(self, user: str | None) -> bool:
+        return self.users is None or (user is not None and user.lower() in self.users)
+
+    # Client with the same interface as notion_client.Client whose calls go through the scheduler
+    def client(self, priority: str = "interactive"):
+        return ScheduledClient(self, priority)
+
+    def call(self, endpoint: str, method: str, kwargs: dict, priority: str = "interactive"):
+        database_id = kwargs.get("database_id") or kwargs.get("parent", {}).get("database_id")
+        if database_id and database_id != self.database_id:
+            raise PermissionError(f"Tenant {self.tenant_id} cannot access database {database_id}")
+        fn = lambda client: getattr(getattr(client, endpoint), method)(**kwargs)
+        return self.scheduler.submit(self, fn, priority).result()
+
+
+class _ScheduledEndpoint:
+    def __init__(self, tenant: Tenant, endpoint: str, priority: str):
+        self._tenant = tenant
+        self._endpoint = endpoint
+        self._priority = priority
+
+    def __getattr__(self, method):
+        return lambda **kwargs: self._tenant.call(self._endpoint, method, kwargs, self._priority)
+
+
+class ScheduledClient:
+    def __init__(self, tenant: Tenant, priority: str):
+        self.databases = _ScheduledEndpoint(tenant, "databases", priority)
+        self.pages = _ScheduledEndpoint(tenant, "pages", priority)
+
+
+class TenantRegistry:
+    def __init__(self, scheduler: FairScheduler = None, client_factory=None):
+        self.scheduler = scheduler or FairScheduler()
+        self.client_factory = client_factory
+        self._tenants = {}
+        self._lock = threading.Lock()
+
+    def register(self, tenant_id: str, database_id: str, token: str, users: list = None) -> Tenant:
+        with self._lock:
+            if tenant_id not in self._tenants:
+                users = {user.lower() for user in users} if users is not None else None
+                # Page calls are only scoped by the token, so a token may not be
+                # shared with tenants that other users can reach
+                for other in self._tenants.values():
+                    if other.token == token and other.users != users:
+                        raise ValueError(f"Tenant {tenant_id} shares a Notion token with {other.tenant_id} but not its users")
+                self._tenants[tenant_id] = Tenant(tenant_id, database_id, token, self.scheduler,
+                                                  self.client_factory, users=users)
+            return self._tenants[tenant_id]
+
+    @property
+    def requires_login(self) -> bool:
+        return any(tenant.users is not None for tenant in self._tenants.values())
+
+    def tenants_for_user(self, user: str | None) -> list:
+        with self._lock:
+            return [tenant for tenant in self._tenants.values() if tenant.allows(user)]
+
+    # Return the tenant if the authenticated user belongs to it; check on every run
+    def authorize(self, user: str | None, tenant_id: str) -> Tenant:
+        with self._lock:
+            tenant = self._tenants.get(tenant_id)
+            if tenant is None or not tenant.allows(user):
+                raise PermissionError(f"{user or 'Anonymous user'} cannot access tenant: {tenant_id}")
+            return tenant
+
+
+# Function to load tenants from a JSON file of the form
+# {"tenant_id": {"database_id": "...", "token": "..." or "token_env": "ENV_VAR_NAME", "users": ["email", ...]}}
+def load_tenant_registry(path: str, default_database_id: str = None, default_token: str = None) -> TenantRegistry:
+    registry = TenantRegistry()
+    if os.path.exists(path):
+        with open(path) as f:
+            config = json.load(f)
+        for tenant_id, tenant_config in config.items():
+            token = tenant_config.get("token") or os.getenv(tenant_config.get("token_env", ""))
+            if not token:
+                raise ValueError(f"No Notion token configured for tenant: {tenant_id}")
+            if not tenant_config.get("users"):
+                raise ValueError(f"No users configured for tenant: {tenant_id}")
+            registry.register(tenant_id, tenant_config["database_id"], token, tenant_config["users"])
+    else:
+        # Single-user setup: one tenant from the environment
+        registry.register("default", default_database_id, default_token)
+    return registry
@@ -0,0 +1,266 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from notion_client import Client, APIResponseError, APIErrorCode
+from notion_tenants import TenantRegistry, FairScheduler
+from collections import deque
+import threading
+import argparse
+import queue
+import math
+import time
+import json
+import re
+
+# Multi-tenant load test against a local Notion stand-in.
+# A bulk tenant runs full-database scans on the same Notion token as one of
+# the interactive tenants, and every tenant shares a small worker pool. The
+# same load is run through the scheduler and straight against Notion, and the
+# test fails if interactive latency through the scheduler is not within the
+# bound and better than without it.
+
+
+# --- Local Notion stand-in ---
+class FakeNotion:
+    def __init__(self, latency: float, rate: int):
+        self.latency = latency
+        self.rate = rate
+        self.databases = {}   # database_id -> list of pages
+        self.windows = {}     # token -> arrival times of accepted requests in the last second
+        self.rate_limited = 0
+        self.lock = threading.Lock()
+
+    def add_database(self, database_id: str, size: int):
+        self.databases[database_id] = [
+            {
+                "object": "page",
+                "id": f"{database_id}-{i}",
+                "last_edited_time": "2025-01-01T00:00:00.000Z",
+                "properties": {
+                    "Job": {"type": "title", "title": [{"text": {"content": f"Job {i}"}}]},
+                    "Company": {"type": "rich_text", "rich_text": [{"text": {"content": f"Company {i % 50}"}}]},
+                    "Status": {"type": "status", "status": {"name": "Rejected" if i % 3 == 0 else "Applied"}},
+                    "Date of application": {"type": "date", "date": {"start": f"2025-{i % 12 + 1:02d}-01"}}
+                }
+            }
+            for i in range(size)
+        ]
+
+    # Sliding one-second window per token; returns the Retry-After seconds when over the limit
+    def admit(self, token: str) -> int:
+        with self.lock:
+            now = time.monotonic()
+            window = self.windows.setdefault(token, deque())
+            while window and window[0] <= now - 1.0:
+                window.popleft()
+            if len(window) < self.rate:
+                window.append(now)
+                return 0
+            self.rate_limited += 1
+            return max(1, math.ceil(window[0] + 1.0 - now))
+
+    def query(self, database_id: str, body: dict) -> dict:
+        pages = self.databases[database_id]
+        start = int(body.get("start_cursor") or 0)
+        end = start + min(body.get("page_size", 100), 100)
+        return {
+            "object": "list",
+            "results": pages[start:end],
+            "has_more": end < len(pages),
+            "next_cursor": str(end) if end < len(pages) else None
+        }
+
+
+def serve_fake_notion(fake: FakeNotion) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            token = self.headers.get("Authorization", "").removeprefix("Bearer ")
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            match = re.search(r"/databases/([^/]+)/query$", self.path)
+            retry_after = fake.admit(token)
+            time.sleep(fake.latency)
+            if retry_after:
+                self._reply(429, {"object": "error", "status": 429, "code": "rate_limited", "message": "Rate limited"},
+                            {"Retry-After": str(retry_after)})
+            elif not match or match.group(1) not in fake.databases:
+                self._reply(404, {"object": "error", "status": 404, "code": "object_not_found", "message": "Not found"})
+            else:
+                self._reply(200, fake.query(match.group(1), body))
+
+        def _reply(self, status: int, payload: dict, headers: dict = None):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# --- Baseline without the scheduler ---
+class DirectTenant:
+    def __init__(self, tenant_id: str, database_id: str, token: str, client_factory, workers: "queue.Queue",
+                 retries: int):
+        self.tenant_id = tenant_id
+        self.database_id = database_id
+        self._notion = client_factory(token)
+        self._workers = workers
+        self._retries = retries
+
+    # Same interface as Tenant.client(); each call takes a shared worker slot and
+    # retries 429s after Retry-After, but is otherwise first come, first served
+    def client(self, priority: str = "interactive"):
+        tenant = self
+
+        class Databases:
+            def query(self, **kwargs):
+                for attempt in range(tenant._retries + 1):
+                    slot = tenant._workers.get()
+                    try:
+                        return tenant._notion.databases.query(**kwargs)
+                    except APIResponseError as e:
+                        if e.code != APIErrorCode.RateLimited or attempt == tenant._retries:
+                            raise
+                        retry_after = float(e.headers.get("Retry-After", 1.0))
+                    finally:
+                        tenant._workers.put(slot)
+                    time.sleep(retry_after)
+
+        class DirectClient:
+            databases = Databases()
+
+        return DirectClient()
+
+
+# --- Load generators ---
+def full_scan(client, database_id: str) -> int:
+    count, cursor = 0, None
+    while True:
+        payload = {"start_cursor": cursor} if cursor else {}
+        response = client.databases.query(database_id=database_id, **payload)
+        count += len(response["results"])
+        if not response.get("has_more"):
+            return count
+        cursor = response["next_cursor"]
+
+
+def run_bulk(tenant, latencies: list, errors: list):
+    started = time.monotonic()
+    try:
+        full_scan(tenant.client("bulk"), tenant.database_id)
+        latencies.append(time.monotonic() - started)
+    except Exception as e:
+        errors.append(e)
+
+
+def run_interactive(tenant, queries: int, think_time: float, latencies: list, errors: list):
+    client = tenant.client()
+    for _ in range(queries):
+        started = time.monotonic()
+        try:
+            client.databases.query(database_id=tenant.database_id, page_size=20)
+            latencies.append(time.monotonic() - started)
+        except Exception as e:
+            errors.append(e)
+        time.sleep(think_time)
+
+
+def percentile(values: list, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))] if values else 0.0
+
+
+def run_scenario(name: str, tenants: list, args) -> dict:
+    bulk, interactive = tenants[0], tenants[1:]
+    latencies = {tenant.tenant_id: [] for tenant in tenants}
+    errors = {tenant.tenant_id: [] for tenant in tenants}
+    threads = [
+        threading.Thread(target=run_bulk, args=(bulk, latencies[bulk.tenant_id], errors[bulk.tenant_id]))
+        for _ in range(args.bulk_scans)
+    ]
+    threads += [
+        threading.Thread(target=run_interactive, args=(tenant, args.queries, args.think_time,
+                                                       latencies[tenant.tenant_id], errors[tenant.tenant_id]))
+        for tenant in interactive
+    ]
+
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    print(f"\n{name} ({elapsed:.1f}s)")
+    print(f"{'tenant':<12}{'samples':>10}{'errors':>10}{'p50 (s)':>10}{'p95 (s)':>10}{'max (s)':>10}")
+    for tenant_id, values in latencies.items():
+        print(f"{tenant_id:<12}{len(values):>10}{len(errors[tenant_id]):>10}{percentile(values, 0.5):>10.2f}"
+              f"{percentile(values, 0.95):>10.2f}{max(values, default=0.0):>10.2f}")
+
+    # The slowest interactive tenant is the one a heavy bulk job would starve
+    return {
+        "p95": max((percentile(latencies[tenant.tenant_id], 0.95) for tenant in interactive), default=0.0),
+        "errors": sum(len(values) for values in errors.values())
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-tenant load test against a local Notion stand-in")
+    parser.add_argument("--interactive-tenants", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=10, help="interactive queries per tenant")
+    parser.add_argument("--think-time", type=float, default=1.0, help="seconds between interactive queries")
+    parser.add_argument("--bulk-scans", type=int, default=3, help="concurrent full scans by the bulk tenant")
+    parser.add_argument("--bulk-size", type=int, default=1000, help="pages in the bulk tenant's database")
+    parser.add_argument("--workers", type=int, default=2, help="workers shared by all tenants")
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated Notion response time in seconds")
+    parser.add_argument("--notion-rate", type=int, default=3, help="requests per second the stand-in allows per token")
+    parser.add_argument("--max-p95", type=float, default=1.0, help="interactive p95 bound through the scheduler")
+    args = parser.parse_args()
+
+    fake = FakeNotion(args.latency, args.notion_rate)
+    server = serve_fake_notion(fake)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    client_factory = lambda token: Client(auth=token, base_url=base_url)
+
+    # The bulk tenant shares its token with tenant-0; the others have their own
+    fake.add_database("db-bulk", args.bulk_size)
+    layout = [("bulk", "db-bulk", "token-shared")]
+    for i in range(args.interactive_tenants):
+        fake.add_database(f"db-{i}", 200)
+        layout.append((f"tenant-{i}", f"db-{i}", "token-shared" if i == 0 else f"token-{i}"))
+
+    registry = TenantRegistry(FairScheduler(workers=args.workers), client_factory)
+    scheduled = run_scenario("With scheduler", [registry.register(*entry) for entry in layout], args)
+    scheduled_429s = fake.rate_limited
+    registry.scheduler.shutdown()
+
+    workers = queue.Queue()
+    for slot in range(args.workers):
+        workers.put(slot)
+    direct = run_scenario("Without scheduler", [
+        DirectTenant(*entry, client_factory, workers, retries=20) for entry in layout
+    ], args)
+    server.shutdown()
+
+    print(f"\nStand-in rate-limited {scheduled_429s} requests with the scheduler "
+          f"and {fake.rate_limited - scheduled_429s} without it.")
+    failures = []
+    if scheduled["errors"]:
+        failures.append(f"{scheduled['errors']} requests failed through the scheduler")
+    if scheduled["p95"] > args.max_p95:
+        failures.append(f"interactive p95 {scheduled['p95']:.2f}s is above {args.max_p95:.2f}s")
+    if args.bulk_scans and args.queries and scheduled["p95"] >= direct["p95"]:
+        failures.append(f"interactive p95 {scheduled['p95']:.2f}s is not better than {direct['p95']:.2f}s without the scheduler")
+    if failures:
+        raise SystemExit("FAIL: " + "; ".join(failures))
+    print(f"PASS: interactive p95 {scheduled['p95']:.2f}s with the scheduler, {direct['p95']:.2f}s without it.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+from notion_snapshot import write_snapshot, load_snapshot
+import os
+
+
+def page(page_id: str, edited: str, status: str = "Applied", date: str = "2025-07-01") -> dict:
+    return {"id": page_id, "last_edited_time": edited, "Job": f"Job {page_id}", "Status": status, "Date of application": date}
+
+
+def snapshot(snapshot_dir, records: list, full: bool = False) -> int:
+    return write_snapshot(str(snapshot_dir), lambda payload: records, full)
+
+
+def statuses(table) -> dict:
+    return dict(zip(table.column("id").to_pylist(), table.column("Status").to_pylist()))
+
+
+def test_keeps_latest_version_of_each_page(tmp_path):
+    snapshot(tmp_path, [page("a", "2025-07-01T10:00:00.000Z"), page("b", "2025-07-01T10:00:00.000Z")])
+    snapshot(tmp_path, [page("a", "2025-07-02T10:00:00.000Z", "Rejected"), page("c", "2025-07-02T10:00:00.000Z")])
+
+    assert statuses(load_snapshot(str(tmp_path))) == {"a": "Rejected", "b": "Applied", "c": "Applied"}
+
+
+def test_same_minute_edit_goes_to_later_snapshot(tmp_path):
+    snapshot(tmp_path, [page("a", "2025-07-01T10:00:00.000Z")])
+    snapshot(tmp_path, [page("a", "2025-07-01T10:00:00.000Z", "Rejected")])
+
+    assert statuses(load_snapshot(str(tmp_path))) == {"a": "Rejected"}
+
+
+def test_month_filter_uses_current_version(tmp_path):
+    snapshot(tmp_path, [page("a", "2025-07-01T10:00:00.000Z", date="2024-03-01")])
+    snapshot(tmp_path, [page("a", "2025-07-02T10:00:00.000Z", date="2025-07-01")])
+
+    assert load_snapshot(str(tmp_path), start_month="2024-01", end_month="2024-12").num_rows == 0
+    assert statuses(load_snapshot(str(tmp_path), start_month="2025-01", end_month="2025-12")) == {"a": "Applied"}
+
+
+def test_unchanged_pages_are_not_written_again(tmp_path):
+    records = [page("a", "2025-07-01T10:00:00.000Z"), page("b", "2025-07-01T10:00:00.000Z")]
+    assert snapshot(tmp_path, records) == 2
+    assert snapshot(tmp_path, records) == 0
+    assert len(os.listdir(tmp_path / "application_month=2025-07")) == 1
+
+
+def test_full_resync_drops_deleted_pages(tmp_path):
+    snapshot(tmp_path, [page("a", "2025-07-01T10:00:00.000Z"), page("b", "2025-07-01T10:00:00.000Z")])
+
+    assert snapshot(tmp_path, [page("a", "2025-07-01T10:00:00.000Z")], full=True) == 1
+    assert statuses(load_snapshot(str(tmp_path))) == {"a": "Applied"}
+    assert snapshot(tmp_path, [page("a", "2025-07-01T10:00:00.000Z")], full=True) == 0
+
+
+def test_deleted_page_can_be_restored(tmp_path):
+    a, b = page("a", "2025-07-01T10:00:00.000Z"), page("b", "2025-07-01T10:00:00.000Z")
+    snapshot(tmp_path, [a, b], full=True)
+    snapshot(tmp_path, [a], full=True)
+
+    assert snapshot(tmp_path, [a, b], full=True) == 1
+    assert statuses(load_snapshot(str(tmp_path))) == {"a": "Applied", "b": "Applied"}
+    assert snapshot(tmp_path, [a, b], full=True) == 0
+
+
+def test_full_resync_compacts_each_month(tmp_path):
+    snapshot(tmp_path, [page("a", "2025-07-01T10:00:00.000Z")])
+    snapshot(tmp_path, [page("a", "2025-07-02T10:00:00.000Z", "Rejected")])
+    snapshot(tmp_path, [page("b", "2025-07-03T10:00:00.000Z", date="2024-03-01")])
+    assert len(os.listdir(tmp_path / "application_month=2025-07")) == 2
+
+    snapshot(tmp_path, [page("a", "2025-07-02T10:00:00.000Z", "Rejected")], full=True)
+    assert len(os.listdir(tmp_path / "application_month=2025-07")) == 1
+    assert not os.path.exists(tmp_path / "application_month=2024-03")
+    assert statuses(load_snapshot(str(tmp_path))) == {"a": "Rejected"}
+
+
+def test_reads_only_requested_columns(tmp_path):
+    snapshot(tmp_path, [page("a", "2025-07-01T10:00:00.000Z"), page("b", "2025-07-01T10:00:00.000Z", date="2024-03-01")])
+
+    table = load_snapshot(str(tmp_path), ["Status"], start_month="2025-01")
+    assert table.column_names == ["id", "last_edited_time", "Status"]
+    assert table.column("id").to_pylist() == ["a"]
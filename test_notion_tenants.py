@@ -0,0 +1,112 @@
+from notion_client import APIResponseError, APIErrorCode
+from notion_tenants import (
+    FairScheduler, Tenant, TenantRegistry, TokenBucket, load_tenant_registry, RATE_LIMIT_RETRIES
+)
+import httpx
+import json
+import time
+import pytest
+
+
+class FakeNotion:
+    def __init__(self, responses: list = None):
+        self.calls = 0
+        self.responses = responses or []
+        self.databases = self
+
+    def query(self, **kwargs):
+        self.calls += 1
+        response = self.responses.pop(0) if self.responses else {"results": []}
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def rate_limited(retry_after: str) -> APIResponseError:
+    response = httpx.Response(429, headers={"Retry-After": retry_after}, json={"code": "rate_limited"})
+    return APIResponseError(response, "Rate limited", APIErrorCode.RateLimited)
+
+
+def fast_tenant(scheduler: FairScheduler, tenant_id: str, client=None) -> Tenant:
+    tenant = Tenant(tenant_id, f"db-{tenant_id}", f"token-{tenant_id}", scheduler,
+                    lambda token: client or FakeNotion(), pool_size=10)
+    scheduler._buckets[tenant.token] = TokenBucket(rate=1000, burst=100)
+    return tenant
+
+
+def test_authorize_rejects_user_outside_tenant():
+    registry = TenantRegistry(FairScheduler(workers=0), lambda token: FakeNotion())
+    registry.register("a", "db-a", "token-a", ["Alice@example.com"])
+    registry.register("b", "db-b", "token-b", ["bob@example.com"])
+
+    assert registry.authorize("alice@example.com", "a").tenant_id == "a"
+    with pytest.raises(PermissionError):
+        registry.authorize("alice@example.com", "b")
+    with pytest.raises(PermissionError):
+        registry.authorize(None, "a")
+
+
+def test_register_rejects_token_shared_across_users():
+    registry = TenantRegistry(FairScheduler(workers=0), lambda token: FakeNotion())
+    registry.register("a", "db-a", "token", ["alice@example.com"])
+    registry.register("a2", "db-a2", "token", ["alice@example.com"])
+
+    with pytest.raises(ValueError):
+        registry.register("b", "db-b", "token", ["bob@example.com"])
+
+
+@pytest.mark.parametrize("config", [
+    {"t": {"database_id": "db", "token": "secret"}},
+    {"t": {"database_id": "db", "users": ["alice@example.com"]}},
+])
+def test_load_tenant_registry_requires_users_and_token(tmp_path, config):
+    path = tmp_path / "tenants.json"
+    path.write_text(json.dumps(config))
+
+    with pytest.raises(ValueError):
+        load_tenant_registry(str(path))
+
+
+def test_call_rejects_other_tenants_database():
+    tenant = fast_tenant(FairScheduler(workers=0), "a")
+
+    with pytest.raises(PermissionError):
+        tenant.call("databases", "query", {"database_id": "db-b"})
+    with pytest.raises(PermissionError):
+        tenant.call("pages", "create", {"parent": {"database_id": "db-b"}})
+
+
+def test_next_job_prefers_interactive_then_round_robin():
+    scheduler = FairScheduler(workers=0)
+    a, b, c = (fast_tenant(scheduler, name) for name in "abc")
+    for tenant, priority, name in [(a, "bulk", "a1"), (a, "bulk", "a2"), (b, "bulk", "b1"),
+                                   (b, "bulk", "b2"), (c, "interactive", "c1")]:
+        scheduler.submit(tenant, name, priority)
+
+    order = [scheduler._next_job()[1] for _ in range(5)]
+    assert order == ["c1", "a1", "b1", "a2", "b2"]
+
+
+def test_rate_limit_requeue_honors_retry_after(monkeypatch):
+    pauses = []
+    monkeypatch.setattr(TokenBucket, "pause", lambda self, seconds: pauses.append(seconds))
+    client = FakeNotion([rate_limited("0.05"), {"results": ["page"]}])
+    scheduler = FairScheduler(workers=1)
+    tenant = fast_tenant(scheduler, "a", client)
+
+    assert tenant.client().databases.query(database_id="db-a") == {"results": ["page"]}
+    assert pauses == [0.05]
+    scheduler.shutdown()
+
+
+def test_rate_limit_gives_up_after_retries():
+    client = FakeNotion([rate_limited("0.05") for _ in range(RATE_LIMIT_RETRIES + 1)])
+    scheduler = FairScheduler(workers=1)
+    tenant = fast_tenant(scheduler, "a", client)
+
+    started = time.monotonic()
+    with pytest.raises(APIResponseError):
+        tenant.client().databases.query(database_id="db-a")
+    assert client.calls == RATE_LIMIT_RETRIES + 1
+    assert time.monotonic() - started >= RATE_LIMIT_RETRIES * 0.05
+    scheduler.shutdown()